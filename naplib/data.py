@@ -236,17 +236,23 @@ class Data(Iterable):
         [{"resp": <class 'list'>, "trial": <class 'int'>}
         {"resp": <class 'list'>, "trial": <class 'int'>}]
         '''
-        if isinstance(index, slice):
-            return Data(self.data[index], strict=self._strict)
-        if isinstance(index, str):
+        # plain field names and trial indices are the common cases, so check them first
+        index_type = type(index)
+        if index_type is str:
             return self.get_field(index)
-        if isinstance(index, (list, np.ndarray)):
-            if isinstance(index[0], str):
-                return Data([{field:x[field] for field in index} for x in self], strict=False)
-            else:
-                return Data([self.data[i] for i in index], strict=False)
+        if index_type is not int:
+            if isinstance(index, slice):
+                return Data(self._data[index], strict=self._strict)
+            if isinstance(index, str):
+                return self.get_field(index)
+            if isinstance(index, (list, np.ndarray)):
+                if isinstance(index[0], str):
+                    fields = list(index)
+                    return Data([{field:trial[field] for field in fields} for trial in self._data], strict=False)
+                else:
+                    return Data([self._data[i] for i in index], strict=False)
         try:
-            return self.data[index]
+            return self._data[index]
         except IndexError:
             raise IndexError(f'Index invalid for this data. Tried to index {index} but length is {len(self)}.')
     
@@ -417,7 +423,7 @@ class Data(Iterable):
         self._mne_info = info
     
     def __iter__(self):
-        return (self[i] for i in range(len(self)))
+        return iter(self._data)
 
     def __len__(self):
         '''
@@ -432,59 +438,58 @@ class Data(Iterable):
         >>> len(data)
         2
         '''
-        return len(self.data)
+        return len(self._data)
     
     def __repr__(self):
         return self.__str__() # until we can think of a better __repr__
     
     def __str__(self):
-        to_return = f'Data object of {len(self)} trials containing {len(self.fields)} fields\n['
-        to_print = 2 if len(self) > 3 else 3
-
-        for trial_idx, trial in enumerate(self[:to_print]):
-            fieldnames = list(trial.keys())
-            to_return += '{'
-            for f, fieldname in enumerate(fieldnames):
-                to_return += f'"{fieldname}": {type(trial[fieldname])}'
-                if f < len(fieldnames)-1:
-                    to_return += ', '
-            if trial_idx < len(self)-1:
-                to_return += '}\n'
-            else:
-                to_return += '}'
+        n_trials = len(self)
+        to_print = 2 if n_trials > 3 else 3
+
+        def trial_to_str(trial):
+            return '{' + ', '.join(f'"{fieldname}": {type(value)}' for fieldname, value in trial.items()) + '}'
+
+        parts = [f'Data object of {n_trials} trials containing {len(self.fields)} fields\n[']
+        for trial_idx, trial in enumerate(self._data[:to_print]):
+            parts.append(trial_to_str(trial))
+            if trial_idx < n_trials-1:
+                parts.append('\n')
 
         if to_print == 3:
-            to_return += ']\n'
+            parts.append(']\n')
         elif to_print == 2:
-            to_return += '\n...\n{'
-            fieldnames = list(self[-1].keys())
-            for f, fieldname in enumerate(fieldnames):
-                to_return += f'"{fieldname}": {type(self[-1][fieldname])}'
-                if f < len(fieldnames)-1:
-                    to_return += ', '
-            to_return += '}]\n'
-
-        return to_return
+            parts.extend(['\n...\n', trial_to_str(self._data[-1]), ']\n'])
+
+        return ''.join(parts)
     
     def _validate_new_out_data(self, input_data, strict=True):
-        first_trial_fields = set(self.fields)
+        if not strict:
+            for trial in input_data:
+                if not isinstance(trial, dict):
+                    raise TypeError(f'input data is not a list of dicts, found {type(trial)}')
+                if not trial:
+                    raise ValueError('A trial should have at least one field.')
+            return
+
+        # dict key views compare like sets, so no per-trial sets need to be built
+        first_trial = self._data[0] if self._data else None
+        first_trial_fields = first_trial.keys() if isinstance(first_trial, dict) else frozenset()
         for trial in input_data:
             if not isinstance(trial, dict):
                 raise TypeError(f'input data is not a list of dicts, found {type(trial)}')
-            trial_fields = set(trial.keys())
-            if not trial_fields:
+            if not trial:
                 raise ValueError('A trial should have at least one field.')
-            if strict and trial_fields != first_trial_fields:
+            if trial.keys() != first_trial_fields:
                 raise ValueError('New data does not contain the same fields as the first trial.')
-            if strict:
-                for required_field in STRICT_FIELDS_REQUIRED:
-                    if required_field not in trial_fields:
-                        raise ValueError(f'For a "strict" Data object, the data does not contain the required field {required_field}.')
+            for required_field in STRICT_FIELDS_REQUIRED:
+                if required_field not in trial:
+                    raise ValueError(f'For a "strict" Data object, the data does not contain the required field {required_field}.')
     
     @property
     def fields(self):
         '''List of strings containing names of all fields in this Data.'''
-        return [k for k, _ in self._data[0].items()] if self._data else []
+        return list(self._data[0]) if self._data else []
     
     @property
     def data(self):
@@ -688,20 +693,16 @@ def join_fields(data_list, fieldname='resp', axis=-1, return_as_data=False):
             [9]])]
     '''
     
+    starting_fields = [] # each one should be a list of np.arrays
     for out in data_list:
         if not isinstance(out, Data):
             raise TypeError(f'All inputs to data_list must be Data instance but found {type(out)}')
         field = out.get_field(fieldname)
         if not isinstance(field[0], np.ndarray):
             raise TypeError(f'Can only concatenate np.ndarrays, but found {type(field[0])} in this field')
+        starting_fields.append(field)
 
-    starting_fields = [out.get_field(fieldname) for out in data_list] # each one should be a list of np.arrays
-    
-    to_return = []
-    
-    zipped_fields = list(zip(*starting_fields))
-    for field_set in zipped_fields:
-        to_return.append(np.concatenate(field_set, axis=axis))
+    to_return = [np.concatenate(field_set, axis=axis) for field_set in zip(*starting_fields)]
         
     if return_as_data:
         return Data([dict([(fieldname, x)]) for x in to_return], strict=False)
@@ -1,12 +1,10 @@
-import copy
 from contextlib import contextmanager, redirect_stderr, redirect_stdout
 from os import devnull
-from multiprocessing import Pool
 
 from tqdm.auto import tqdm
 import numpy as np
-from sklearn.base import BaseEstimator
-from mne.decoding.receptive_field import _delay_time_series
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, clone
 from sklearn.linear_model import RidgeCV
 
 from ..utils import _parse_outstruct_args
@@ -99,18 +97,35 @@ class TRF(BaseEstimator):
     def _ndelays(self):
         return self._smax - self._smin
         
-    def _delay_and_reshape(self, X, y=None):
+    def _delay_and_reshape(self, X, out=None):
         """Delay and reshape the variables.
-        X and y should be arrays.
-        X has shape (time, features)
+        X should be an array with shape (time, features).
+        If given, out is a contiguous array of shape (time, features * n_delays)
+        which the delayed X is written into instead of a new array.
         """
         if not X.ndim == 2:
             raise ValueError(f'Each trial input must be 2 dimensional but got trial with shape {X.shape}')
-        # X is now shape (n_times, n_feats, n_delays)
-        X = _delay_time_series(X, self.tmin, self.tmax, self.sfreq, fill_mean=False)
-        X = X.reshape(X.shape[0], -1)
+        if out is None:
+            out = np.empty((X.shape[0], X.shape[1] * self._ndelays))
+        # fill out through a view of shape (n_times, n_feats, n_delays)
+        _delay_time_series(X, self._smin, self._smax, out.reshape(X.shape[0], X.shape[1], self._ndelays))
 
-        return X, y
+        return out
+
+    def _delay_and_concatenate(self, X):
+        """Delay and reshape each trial in X and stack them over time.
+        The output is preallocated and each trial is delayed directly into
+        it, so the full delayed design matrix is only held in memory once.
+        X is a list of arrays, each with shape (time, features)
+        """
+        n_times = [xx.shape[0] for xx in X]
+        X_delayed = np.empty((sum(n_times), X[0].shape[-1] * self._ndelays))
+        start = 0
+        for xx, n in zip(X, n_times):
+            self._delay_and_reshape(xx, out=X_delayed[start:start+n])
+            start += n
+
+        return X_delayed
 
     def fit(self, data=None, X='aud', y='resp'):
         '''
@@ -151,28 +166,20 @@ class TRF(BaseEstimator):
         self.n_targets_ = y[0].shape[1]
         self.y_feats_ = y[0].shape[-1] if self.ndim_y_==3 else 1
 
-        X_delayed, y_delayed = [], []
-        for xx, yy in zip(X, y):
-            X_tmp, y_tmp = self._delay_and_reshape(xx, yy)
-            X_delayed.append(X_tmp)
-            y_delayed.append(y_tmp)
-        
-        X_delayed = np.concatenate(X_delayed, axis=0)
-        y_delayed = np.concatenate(y_delayed, axis=0)
+        X_delayed = self._delay_and_concatenate(X)
+        y_delayed = np.concatenate(y, axis=0)
         y_delayed = [yy.copy() for yy in y_delayed.swapaxes(0, 1)]
         
-        # for each target variable, fit a TRF model
-        self.models_ = [None] * len(y_delayed)
-        
-        args = []
-        for ch, y_single in enumerate(y_delayed):
-            args.append((ch, X_delayed, y_single, copy.deepcopy(self.estimator)))
-
-        with Pool(self.n_jobs) as p:
-            with tqdm(total=len(y_delayed), disable=not self.show_progress) as pbar:
-                for ch, model in p.imap_unordered(_fit_channel, args):
-                    self.models_[ch] = model
-                    pbar.update()
+        # for each target variable, fit a TRF model. The design matrix is shared by
+        # all targets, so joblib memory-maps it for the workers rather than pickling
+        # it once per target (copy-on-write, in case the estimator modifies X)
+        fitted_models = Parallel(n_jobs=self.n_jobs, mmap_mode='c', return_as='generator')(
+            delayed(_fit_channel)(X_delayed, y_single, clone(self.estimator, safe=False))
+            for y_single in y_delayed
+        )
+        self.models_ = []
+        for model in tqdm(fitted_models, total=len(y_delayed), disable=not self.show_progress):
+            self.models_.append(model)
 
         return self
     
@@ -180,14 +187,11 @@ class TRF(BaseEstimator):
     def coef_(self):
         if not hasattr(self, 'ndim_y_'):
             raise ValueError(f'Must call fit() first before accessing coef_ attribute.')
-        coefs_ = []
-        for mdl in self.models_:
-            if self.ndim_y_ == 3:
-                coefs_.append(mdl.coef_.reshape(1, self.y_feats_, self.X_feats_, self._ndelays))
-            else:
-                coefs_.append(mdl.coef_.reshape(1, self.X_feats_, self._ndelays))
-                
-        return np.concatenate(coefs_, axis=0) # shape (num_outputs[, target_features], X_features, lags)
+        # shape (num_outputs[, target_features], X_features, lags)
+        coefs_ = np.stack([mdl.coef_ for mdl in self.models_], axis=0)
+        if self.ndim_y_ == 3:
+            return coefs_.reshape(-1, self.y_feats_, self.X_feats_, self._ndelays)
+        return coefs_.reshape(-1, self.X_feats_, self._ndelays)
             
     def predict(self, data=None, X='aud'):
         '''
@@ -216,24 +220,22 @@ class TRF(BaseEstimator):
         
         X = _parse_outstruct_args(data, X)
         
-        X_delayed = []
+        # each trial is delayed separately so there is no leakage across trial
+        # boundaries, which lets each model predict all trials in a single call
+        X_delayed = self._delay_and_concatenate(X)
+        trial_ends = np.cumsum([xx.shape[0] for xx in X])[:-1]
 
-        for xx in X:
-            X_tmp, _ = self._delay_and_reshape(xx)
-            X_delayed.append(X_tmp)
-            
-        y_pred = [[] for _ in range(len(X))]
-        for ii, x_trial in enumerate(X_delayed):
-            for mdl in self.models_:
-                tmp_pred = mdl.predict(x_trial)
-                if self.ndim_y_ == 2:
-                    tmp_pred = tmp_pred.reshape(-1,1)
-                else:
-                    tmp_pred = tmp_pred.reshape(tmp_pred.shape[0],1,-1)
-                y_pred[ii].append(tmp_pred)
-            y_pred[ii] = np.concatenate(y_pred[ii], axis=1)
+        y_pred = []
+        for mdl in self.models_:
+            tmp_pred = mdl.predict(X_delayed)
+            if self.ndim_y_ == 2:
+                tmp_pred = tmp_pred.reshape(-1,1)
+            else:
+                tmp_pred = tmp_pred.reshape(tmp_pred.shape[0],1,-1)
+            y_pred.append(tmp_pred)
+        y_pred = np.concatenate(y_pred, axis=1)
         
-        return y_pred
+        return np.split(y_pred, trial_ends, axis=0)
     
     def score(self, data=None, X='aud', y='resp'):
         '''
@@ -270,21 +272,13 @@ class TRF(BaseEstimator):
         if not hasattr(self, 'models_'):
             raise ValueError(f'Must call .fit() before can call .score()')
         
-        X_, y_ = _parse_outstruct_args(data, copy.deepcopy(X), copy.deepcopy(y))    
+        X_, y_ = _parse_outstruct_args(data, X, y)
 
-        X_delayed, y_delayed = [], []
-        
         if y_[0].ndim == 1:
             y_ = [yy[:,np.newaxis] for yy in y_]
-        
 
-        for xx, yy in zip(X_, y_):
-            X_tmp, y_tmp = self._delay_and_reshape(xx, yy)
-            X_delayed.append(X_tmp)
-            y_delayed.append(y_tmp)
-        
-        X_delayed = np.concatenate(X_delayed, axis=0)
-        y_delayed = np.concatenate(y_delayed, axis=0)
+        X_delayed = self._delay_and_concatenate(X_)
+        y_delayed = np.concatenate(y_, axis=0)
         
         scores = []
         for target_idx in range(y_delayed.shape[1]):
@@ -327,31 +321,49 @@ class TRF(BaseEstimator):
         if not hasattr(self, 'models_'):
             raise ValueError(f'Must call .fit() before can call .score()')
         
-        X_, y_ = _parse_outstruct_args(data, copy.deepcopy(X), copy.deepcopy(y))    
+        X_, y_ = _parse_outstruct_args(data, X, y)
 
-        X_delayed, y_delayed = [], []
-        
         if y_[0].ndim == 1:
             y_ = [yy[:,np.newaxis] for yy in y_]
-            
-        for xx, yy in zip(X_, y_):
-            X_tmp, y_tmp = self._delay_and_reshape(xx, yy)
-            X_delayed.append(X_tmp)
-            y_delayed.append(y_tmp)
-        
-        X_delayed = np.concatenate(X_delayed, axis=0)
-        y_delayed = np.concatenate(y_delayed, axis=0)
+
+        X_delayed = self._delay_and_concatenate(X_)
+        y_delayed = np.concatenate(y_, axis=0)
                 
-        scores = []
-        for target_idx in range(y_delayed.shape[1]):
-            y_thistarget = y_delayed[:,target_idx].reshape(-1,)
-            pred = self.models_[target_idx].predict(X_delayed).reshape(-1,)
-            scores.append(np.corrcoef(y_thistarget, pred)[0,1])
+        y_pred = np.empty(y_delayed.shape)
+        for target_idx, mdl in enumerate(self.models_):
+            y_pred[:,target_idx] = mdl.predict(X_delayed).reshape(y_pred[:,target_idx].shape)
         
-        return np.array(scores)
+        return _corr_per_target(y_delayed, y_pred)
+
+
+def _delay_time_series(X, smin, smax, out):
+    """Fill out, of shape (n_times, n_features, n_delays), with time-lagged
+    copies of X for each delay (in samples) from smin up to (not including)
+    smax, with zeros wherever a delay moves past the edge of X.
+    This matches mne.decoding.receptive_field._delay_time_series with
+    fill_mean=False, without depending on that private function."""
+    for ii, delay in enumerate(range(smin, smax)):
+        if delay < 0:
+            out[:delay, :, ii] = X[-delay:]
+            out[delay:, :, ii] = 0
+        elif delay > 0:
+            out[delay:, :, ii] = X[:-delay]
+            out[:delay, :, ii] = 0
+        else:
+            out[:, :, ii] = X
+    return out
+
 
+def _fit_channel(X, y, model):
+    return model.fit(X, y)
 
-def _fit_channel(args):
-    ch, X, y, model = args
-    return ch, model.fit(X, y)
 
+def _corr_per_target(y_true, y_pred):
+    """Pearson correlation for each target (the second dimension of y_true and
+    y_pred), computed over all other dimensions at once."""
+    y_true = np.moveaxis(y_true, 1, 0).reshape(y_true.shape[1], -1)
+    y_pred = np.moveaxis(y_pred, 1, 0).reshape(y_pred.shape[1], -1)
+    y_true = y_true - y_true.mean(axis=1, keepdims=True)
+    y_pred = y_pred - y_pred.mean(axis=1, keepdims=True)
+    cross = np.einsum('ij,ij->i', y_true, y_pred)
+    return cross / np.sqrt(np.einsum('ij,ij->i', y_true, y_true) * np.einsum('ij,ij->i', y_pred, y_pred))
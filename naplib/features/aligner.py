@@ -1,5 +1,7 @@
 import os
 from os.path import join, isdir, dirname
+import mmap
+import re
 import unicodedata
 import string
 import shutil
@@ -17,6 +19,14 @@ from ..data import Data
 from .prosodylab_aligner import run_aligner
 
 
+# translation table which deletes all punctuation except apostrophes
+_PUNCT_TABLE = str.maketrans('', '', string.punctuation.replace("'", ''))
+
+# tier headers and intervals in a long-format TextGrid file
+_TEXTGRID_TIER_PATTERN = re.compile(rb'item \[\d+\]:')
+_TEXTGRID_INTERVAL_PATTERN = re.compile(rb'xmin = (\S+)\s+xmax = (\S+)\s+text = "((?:[^"]|"")*)"')
+
+
 class Aligner():
     '''
     This class performs phoneme and word alignment using audio files
@@ -77,25 +87,6 @@ class Aligner():
                 'install it with "pip install TextGrid"')
 
 
-    def _remove_nonword_characters_and_punctuation_and_capitalize(self, s):
-        exclude = set(string.punctuation)
-        exclude.remove("'")
-        s = ''.join(ch for ch in s if ch not in exclude)
-        # s = s.translate(str.maketrans('', '', string.punctuation))
-        s = s.upper()
-        return s
-
-    def _convert_text_to_ascii(self, name, root):
-        new_name = name.replace('.txt', '.lab')
-        new_folder = self.tmp_dir
-
-        unicode_file = open(os.path.join(root, name))
-        unicode_data = unicode_file.read() #.decode(input_codec)
-        unicode_data = self._remove_nonword_characters_and_punctuation_and_capitalize(unicode_data)
-        ascii_data = unicodedata.normalize('NFKD', unicode_data).encode('ascii','ignore')
-        ascii_file = open(os.path.join(new_folder, new_name), 'wb')
-        ascii_file.write(ascii_data)
-
     def align(self, data=None, name='name', sound='sound',
               soundf='soundf', transcript='transcript',
               dataf='dataf', length='length'):
@@ -283,8 +274,6 @@ class Aligner():
         | │   └── file2.wrd
         | │   └── file2.TextGrid
         '''        
-        import textgrid
-
         if names is not None and not isinstance(names, list):
             raise TypeError(f'names argument must be a list, or None, but got {type(names)}')
 
@@ -297,7 +286,7 @@ class Aligner():
         try:
             wavefilepath_ = join(self.filedir_, 'test.wav')
             subprocess.run(['sox', wavefilepath_, wavefilepath_], check=True, capture_output=True)
-            os.system(f'{resample_path} -s 16000 -r {audio_dir} -w {self.tmp_dir}')
+            subprocess.run([resample_path, '-s', '16000', '-r', audio_dir, '-w', self.tmp_dir], check=True)
         except (OSError, subprocess.SubprocessError, subprocess.CalledProcessError):
             logger.warning('Could not find sox. Using scipy to resample and save .wav files instead')
             # don't have sox, so use scipy instead
@@ -315,8 +304,8 @@ class Aligner():
 
         for root, _, files in os.walk(text_dir, topdown=False):
             for name in files:
-                if '.txt' in name:
-                    self._convert_text_to_ascii(name, root)
+                if name.endswith('.txt'):
+                    _convert_text_to_ascii(name, root, self.tmp_dir)
 
         logger.info('Performing alignment...')
 
@@ -327,44 +316,38 @@ class Aligner():
         logger.info(f'Converting .TextGrid files to .phn and .wrd in {self.output_dir}')
 
         # Convert textgrid files to .phn and .wrd files in output_dir
+        names_to_keep = set(names) if names is not None else None
         for root, _, files in os.walk(self.tmp_dir, topdown=False):
             for name in files:
-                if '.TextGrid' in name:
+                if name.endswith('.TextGrid'):
+                    base_name = name[:-len('.TextGrid')]
 
-                    if names is not None and name.split('.TextGrid')[0] not in names:
+                    if names_to_keep is not None and base_name not in names_to_keep:
                         continue
 
                     # copy TextGrid file to output_dir so they are saved
-                    os.system(f'cp {join(root, name)} {join(self.output_dir, name)}')
-
-                    new_phn_name = name.replace('.TextGrid', '.phn')
-                    new_wrd_name = name.replace('.TextGrid', '.wrd')
-
-                    tg = textgrid.TextGrid.fromFile(join(root, name))
-                    phones = tg[0]
-                    words = tg[1]
+                    shutil.copyfile(join(root, name), join(self.output_dir, name))
 
-                    # write phn file
+                    new_phn_name = base_name + '.phn'
+                    new_wrd_name = base_name + '.wrd'
 
-                    phn_file = open(os.path.join(self.output_dir, new_phn_name), 'w')
+                    textgrid_file = join(root, name)
 
-                    for phone_seg in phones:
-                        if phone_seg.mark == "":
-                            phone_seg.mark = "sp"
-                        if phone_seg.mark != "sil":
-                            print(f"{phone_seg.minTime} {phone_seg.maxTime} {phone_seg.mark}", file=phn_file)
+                    # write phn file from the first tier (phones)
 
-                    phn_file.close()
+                    phn_lines = [f"{min_time} {max_time} {mark or 'sp'}\n"
+                                 for min_time, max_time, mark in _iter_textgrid_intervals(textgrid_file, 0)
+                                 if mark != "sil"]
+                    with open(os.path.join(self.output_dir, new_phn_name), 'w') as phn_file:
+                        phn_file.write(''.join(phn_lines))
 
-                    # write wrd file
+                    # write wrd file from the second tier (words)
 
-                    wrd_file = open(os.path.join(self.output_dir, new_wrd_name), 'w')
-
-                    for word_seg in words:
-                        if word_seg.mark != "sil":
-                            print(f"{word_seg.minTime} {word_seg.maxTime} {word_seg.mark}", file=wrd_file)
-
-                    wrd_file.close()
+                    wrd_lines = [f"{min_time} {max_time} {mark}\n"
+                                 for min_time, max_time, mark in _iter_textgrid_intervals(textgrid_file, 1)
+                                 if mark != "sil"]
+                    with open(os.path.join(self.output_dir, new_wrd_name), 'w') as wrd_file:
+                        wrd_file.write(''.join(wrd_lines))
 
             logger.info('Finished creating alignment files.')
 
@@ -495,3 +478,30 @@ class Aligner():
         return Data(alignment_results, strict=False)
 
 
+def _iter_textgrid_intervals(filename, tier_index):
+    """Yield (min_time, max_time, mark) for each interval in one tier of a
+    long-format TextGrid file. The file is memory-mapped and scanned with a
+    regex instead of building a full textgrid.TextGrid object. Times are
+    rounded to 5 digits, which is the same precision textgrid reads them with."""
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+        tier_starts = [m.end() for m in _TEXTGRID_TIER_PATTERN.finditer(contents)]
+        if tier_index >= len(tier_starts):
+            raise ValueError(f'TextGrid file {filename} only has {len(tier_starts)} tiers, '
+                             f'but tried to read tier {tier_index}')
+        tier_starts.append(len(contents))
+        for m in _TEXTGRID_INTERVAL_PATTERN.finditer(contents, tier_starts[tier_index], tier_starts[tier_index+1]):
+            yield (round(float(m.group(1)), 5), round(float(m.group(2)), 5),
+                   m.group(3).decode('utf-8').replace('""', '"'))
+
+
+def _convert_text_to_ascii(name, root, output_dir):
+    """Remove punctuation from a transcript, capitalize it, and save it as
+    an ascii .lab file in output_dir."""
+    new_name = name[:-len('.txt')] + '.lab'
+
+    with open(os.path.join(root, name)) as unicode_file:
+        unicode_data = unicode_file.read()
+    unicode_data = unicode_data.translate(_PUNCT_TABLE).upper()
+    ascii_data = unicodedata.normalize('NFKD', unicode_data).encode('ascii','ignore')
+    with open(os.path.join(output_dir, new_name), 'wb') as ascii_file:
+        ascii_file.write(ascii_data)
@@ -1,5 +1,6 @@
 import numpy as np
 from scipy.ndimage import gaussian_filter1d
+from joblib import Parallel, delayed
 
 from ..stats import discriminability
 from ..utils import _parse_outstruct_args
@@ -22,18 +23,22 @@ def get_label_change_points(x):
         New label (from input `x`) after each transition.
     prior_labels : array of shape (n_changes, )
         Old label (from input `x`) before each transition.
+
+    Notes
+    -----
+    The outputs are always 1-dimensional, even with a single transition. If `x` never
+    changes value, all three outputs are empty.
     '''
 
     if not isinstance(x, np.ndarray):
-        assert TypeError(f'input must be numpy array but got {type(x)}')
+        raise TypeError(f'input must be numpy array but got {type(x)}')
 
-    diff_x = np.concatenate([np.array([0]), np.diff(x)])
-    locs = np.argwhere(diff_x!=0).squeeze()
+    locs = np.flatnonzero(x[1:] != x[:-1]) + 1
     labels = x[locs]
     labels_prior = x[locs-1]
     return locs, labels, labels_prior
 
-def segment_around_label_transitions(data=None, field=None, labels=None, prechange_samples=50, postchange_samples=300, elec_lag=None):
+def segment_around_label_transitions(data=None, field=None, labels=None, prechange_samples=50, postchange_samples=300, elec_lag=None, n_jobs=1):
     '''
     Cut x around the transition points given by the changes in the labels.
     
@@ -60,6 +65,9 @@ def segment_around_label_transitions(data=None, field=None, labels=None, prechan
         Provides the lag (in samples) of each electrode, must be length=n_electrodes=data[i].shape[1].
         Only used if not None. This can be computed with many methods, for example, using
         ``nl.segmentation.electrode_lags_fratio``.
+    n_jobs : int, default=1
+        Number of jobs to use to segment trials in parallel. Trials are segmented in threads,
+        so this mainly helps when there are many long trials with many electrodes.
         
     Returns
     -------
@@ -138,38 +146,82 @@ def segment_around_label_transitions(data=None, field=None, labels=None, prechan
         labels, other_labels = labels[0], labels[1:]
         return_multiple_labels = True
     else:
-        other_labels = (labels,)
+        other_labels = ()
         return_multiple_labels = False
 
-    segments = []
-    new_labels = []
-    prior_labels = []
-    other_labels_to_return = [[] for _ in range(len(other_labels))]
-    for i, tmp_unpack in enumerate(zip(x, labels, *other_labels)):
-        x_i, labels_i, other_labels_i = tmp_unpack[0], tmp_unpack[1], tmp_unpack[2:]
-        label_changepoints, labels_at_changepoints, labels_before_changepoints = get_label_change_points(labels_i)
-        
-        label_changepoints = label_changepoints.astype('int')
-        labels_before_changepoints = labels_before_changepoints.astype('int')
-        
-        for change_point, new_lab, prior_lab in zip(label_changepoints, labels_at_changepoints, labels_before_changepoints):
-            if change_point >= prechange_samples and change_point+postchange_samples <= x_i.shape[0]:
-                if elec_lag is not None:
-                    tmp_x_i_region = np.array([x_i[change_point-prechange_samples+elec_lag[elec_idx]:change_point+postchange_samples+elec_lag[elec_idx], elec_idx] for elec_idx in range(len(elec_lag))])
-                    segments.append(tmp_x_i_region.transpose())
-                else:
-                    segments.append(x_i[change_point-prechange_samples:change_point+postchange_samples])
-                new_labels.append(new_lab)
-                prior_labels.append(prior_lab)
+    if elec_lag is not None:
+        elec_lag = np.asarray(elec_lag)
+        elec_idx = np.arange(len(elec_lag))
+    else:
+        elec_idx = None
+
+    # sample offsets of each segment relative to its transition point
+    segment_offsets = np.arange(-prechange_samples, postchange_samples)
+
+    trial_args = zip(x, labels, *other_labels)
+    if n_jobs == 1:
+        results = [_segment_one_trial(tmp_unpack, prechange_samples, postchange_samples, segment_offsets, elec_lag, elec_idx)
+                   for tmp_unpack in trial_args]
+    else:
+        # numpy releases the GIL while gathering, so threads avoid copying every trial to a worker process
+        results = Parallel(n_jobs, prefer='threads')(
+            delayed(_segment_one_trial)(tmp_unpack, prechange_samples, postchange_samples, segment_offsets, elec_lag, elec_idx)
+            for tmp_unpack in trial_args)
+    # trials without a full segment around any transition contribute nothing
+    results = [res for res in results if res is not None]
+
+    segments = [res[0] for res in results]
+    new_labels = [res[1] for res in results]
+    prior_labels = [res[2] for res in results]
+    other_labels_to_return = [[res[3][j] for res in results] for j in range(len(other_labels))]
+
+    # join the per-trial batches in one copy each, keeping empty outputs when there are no trials
+    segments = _concatenate_trials(segments)
+    new_labels = _concatenate_trials(new_labels)
+    prior_labels = _concatenate_trials(prior_labels)
 
-                for i, other_labs in enumerate(other_labels_i):
-                    other_labels_to_return[i].append(other_labs[change_point-prechange_samples:change_point+postchange_samples])
-                    
     if return_multiple_labels:
-         return np.array(segments), (np.array(new_labels), *[np.array(tt) for tt in other_labels_to_return]), np.array(prior_labels)
+         return segments, (new_labels, *[_concatenate_trials(tt) for tt in other_labels_to_return]), prior_labels
     else:
-        return np.array(segments), np.array(new_labels), np.array(prior_labels)
+        return segments, new_labels, prior_labels
     
+def _segment_one_trial(tmp_unpack, prechange_samples, postchange_samples, segment_offsets, elec_lag, elec_idx):
+    x_i, labels_i, other_labels_i = tmp_unpack[0], tmp_unpack[1], tmp_unpack[2:]
+    # convert once per trial so any array-like (e.g. a nested list or a CPU tensor) can be indexed below
+    x_i = np.asarray(x_i)
+    labels_i = np.asarray(labels_i)
+    label_changepoints, labels_at_changepoints, labels_before_changepoints = get_label_change_points(labels_i)
+    if label_changepoints.size == 0:
+        return None
+
+    labels_before_changepoints = labels_before_changepoints.astype('int')
+
+    # only keep transitions with a full segment around them
+    valid = (label_changepoints >= prechange_samples) & (label_changepoints + postchange_samples <= x_i.shape[0])
+    if elec_lag is not None:
+        # the lagged window of every electrode must also fit inside the trial
+        valid &= (label_changepoints - prechange_samples + elec_lag.min() >= 0) & \
+                 (label_changepoints + postchange_samples + elec_lag.max() <= x_i.shape[0])
+    if not valid.any():
+        return None
+    label_changepoints = label_changepoints[valid]
+
+    # gather all segments of this trial at once, indexing with shape (n_segments, time)
+    segment_idx = label_changepoints[:, np.newaxis] + segment_offsets
+    if elec_lag is not None:
+        # shift the window of each electrode by its lag
+        segments = x_i[segment_idx[:, :, np.newaxis] + elec_lag, elec_idx]
+    else:
+        segments = x_i[segment_idx]
+    other_segments = [np.asarray(other_labs)[segment_idx] for other_labs in other_labels_i]
+
+    return segments, labels_at_changepoints[valid], labels_before_changepoints[valid], other_segments
+
+def _concatenate_trials(arrays):
+    if not arrays:
+        return np.array([])
+    return np.concatenate(arrays, axis=0)
+
 def electrode_lags_fratio(data=None, field=None, labels=None, max_lag=20, return_fratios=False):
     '''
     Compute lags of each electrode based on peak of f-ratio to a given label, such as
@@ -209,12 +261,13 @@ def electrode_lags_fratio(data=None, field=None, labels=None, max_lag=20, return
     
     fratios_lags = discriminability(segments.transpose((2,1,0)), labels, elec_mode='individual')
     
-    fratios_lags_smooth = gaussian_filter1d(fratios_lags, 0.5, mode='constant')
+    # smooth in place rather than allocating a second (n_electrodes, max_lag) array
+    gaussian_filter1d(fratios_lags, 0.5, mode='constant', output=fratios_lags)
 
-    lags = fratios_lags_smooth.argmax(-1)
+    lags = fratios_lags.argmax(-1)
     
     if return_fratios:
-        return lags, fratios_lags_smooth
+        return lags, fratios_lags
     else:
         return lags
 
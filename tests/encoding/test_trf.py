@@ -3,8 +3,10 @@ import numpy as np
 from scipy.signal import convolve
 
 from naplib.encoding import TRF
+from naplib.encoding.trf import _delay_time_series
 from naplib import Data
 from sklearn.linear_model import Ridge, RidgeCV
+from mne.decoding.receptive_field import _delay_time_series as mne_delay_time_series
 
 @pytest.fixture(scope='module')
 def data():
@@ -113,6 +115,36 @@ def test_good_pred_STRF():
     assert len(pred) == 1
     assert pred[0].shape == (100, 6)
 
+def test_pred_multiple_trials_STRF():
+    rng = np.random.default_rng(1)
+    lengths = [300, 250, 120]
+    X = [rng.random(size=(n, 10)) for n in lengths]
+    y = [rng.random(size=(n, 6)) for n in lengths]
+
+    model = TRF(tmin=-0.04, tmax=0.02, sfreq=100, estimator=Ridge(0.5))
+    model.fit(X=X, y=y)
+    pred = model.predict(X=X)
+    assert isinstance(pred, list)
+    assert len(pred) == len(lengths)
+    for i, n in enumerate(lengths):
+        assert pred[i].shape == (n, 6)
+        assert np.allclose(pred[i], model.predict(X=[X[i]])[0])
+
+def test_pred_multiple_trials_stim_recon():
+    rng = np.random.default_rng(1)
+    lengths = [300, 250, 120]
+    X = [rng.random(size=(n, 1, 10)) for n in lengths]
+    y = [rng.random(size=(n, 6)) for n in lengths]
+
+    model = TRF(tmin=-0.05, tmax=-0.01, sfreq=100, estimator=Ridge(0.5))
+    model.fit(X=y, y=X)
+    pred = model.predict(X=y)
+    assert isinstance(pred, list)
+    assert len(pred) == len(lengths)
+    for i, n in enumerate(lengths):
+        assert pred[i].shape == (n, 1, 10)
+        assert np.allclose(pred[i], model.predict(X=[y[i]])[0])
+
 def test_scoring_STRF():
     rng = np.random.default_rng(1)
     X = [rng.random(size=(1000, 10)), rng.random(size=(900, 10))]
@@ -133,6 +165,35 @@ def test_corrs_STRF():
     corrs = model.corr(X=X, y=y)
     assert corrs.shape == (6,)
 
+def test_corrs_match_corrcoef_STRF():
+    rng = np.random.default_rng(1)
+    X = [rng.random(size=(1000, 10)), rng.random(size=(900, 10))]
+    y = [X[0][:, :6] + rng.random(size=(1000, 6)), X[1][:, :6] + rng.random(size=(900, 6))]
+
+    model = TRF(tmin=-0.04, tmax=0, sfreq=100, estimator=Ridge(0.5))
+    model.fit(X=X, y=y)
+    corrs = model.corr(X=X, y=y)
+
+    y_all = np.concatenate(y, axis=0)
+    pred_all = np.concatenate(model.predict(X=X), axis=0)
+    expected = [np.corrcoef(y_all[:, t], pred_all[:, t])[0, 1] for t in range(6)]
+    assert np.allclose(corrs, expected)
+
+def test_corrs_match_corrcoef_stim_recon():
+    rng = np.random.default_rng(1)
+    y = [rng.random(size=(1000, 6)), rng.random(size=(900, 6))]
+    X = [yy[:, :2, np.newaxis] + rng.random(size=(yy.shape[0], 2, 5)) for yy in y]
+
+    model = TRF(tmin=-0.05, tmax=-0.01, sfreq=100, estimator=Ridge(0.5))
+    model.fit(X=y, y=X)
+    corrs = model.corr(X=y, y=X)
+    assert corrs.shape == (2,)
+
+    X_all = np.concatenate(X, axis=0)
+    pred_all = np.concatenate(model.predict(X=y), axis=0)
+    expected = [np.corrcoef(X_all[:, t].ravel(), pred_all[:, t].ravel())[0, 1] for t in range(2)]
+    assert np.allclose(corrs, expected)
+
 def test_bad_receptive_field():
     with pytest.raises(ValueError):
         _ = TRF(tmin=0.09, tmax=0, sfreq=100)
@@ -140,3 +201,16 @@ def test_bad_receptive_field():
     with pytest.raises(ValueError):
         _ = TRF(tmin=-0.03, tmax=-0.09, sfreq=100)
 
+
+@pytest.mark.parametrize('smin,smax', [(-4, -1), (-3, 2), (0, 0), (1, 4)])
+@pytest.mark.parametrize('n_times', [50, 3])
+def test_delay_time_series_matches_mne(smin, smax, n_times):
+    # smax is inclusive here, as in mne. n_times=3 is shorter than all but the (0, 0) delay span,
+    # and out starts as nan so every element must be written
+    rng = np.random.default_rng(1)
+    X = rng.random(size=(n_times, 4))
+    n_delays = smax - smin + 1
+    out = np.full((n_times, 4, n_delays), np.nan)
+    delayed = _delay_time_series(X, smin, smax + 1, out)
+    expected = mne_delay_time_series(X, smin, smax, 1., fill_mean=False)
+    assert np.array_equal(delayed, expected)
@@ -6,6 +6,7 @@ import contextlib
 import subprocess
 
 from naplib.features import Aligner
+from naplib.features.aligner import _iter_textgrid_intervals, _convert_text_to_ascii
 from naplib import Data
 
 @pytest.fixture(scope='module')
@@ -72,3 +73,63 @@ def test_alignment_from_outstruct(dirs):
         for trial in label_out[field]:
             if isinstance(trial, np.ndarray):
                 assert trial.shape[0] == dirs['outstruct']['resp'][0].shape[0]
+
+def test_textgrid_intervals_match_saved_phn_and_wrd(dirs):
+    output_dir = dirs['out']+'1'
+    textgrid_file = os.path.join(output_dir, 'test1.TextGrid')
+    # format the tiers the same way as Aligner.align_files
+    phn_lines = [f"{min_time} {max_time} {mark or 'sp'}\n"
+                 for min_time, max_time, mark in _iter_textgrid_intervals(textgrid_file, 0)
+                 if mark != "sil"]
+    wrd_lines = [f"{min_time} {max_time} {mark}\n"
+                 for min_time, max_time, mark in _iter_textgrid_intervals(textgrid_file, 1)
+                 if mark != "sil"]
+    with open(os.path.join(output_dir, 'test1.phn')) as f:
+        assert ''.join(phn_lines) == f.read()
+    with open(os.path.join(output_dir, 'test1.wrd')) as f:
+        assert ''.join(wrd_lines) == f.read()
+
+def test_textgrid_intervals_empty_and_quoted_marks(tmp_path):
+    textgrid_file = tmp_path / 'small.TextGrid'
+    textgrid_file.write_text('''File type = "ooTextFile"
+Object class = "TextGrid"
+
+xmin = 0
+xmax = 1
+tiers? <exists>
+size = 1
+item []:
+	item [1]:
+		class = "IntervalTier"
+		name = "phones"
+		xmin = 0
+		xmax = 1
+		intervals: size = 3
+			intervals [1]:
+				xmin = 0
+				xmax = 0.25
+				text = ""
+			intervals [2]:
+				xmin = 0.25
+				xmax = 0.5
+				text = "say ""hi"""
+			intervals [3]:
+				xmin = 0.5
+				xmax = 1
+				text = "AH1"
+''')
+    intervals = list(_iter_textgrid_intervals(str(textgrid_file), 0))
+    assert intervals == [(0.0, 0.25, ''), (0.25, 0.5, 'say "hi"'), (0.5, 1.0, 'AH1')]
+
+    with pytest.raises(ValueError) as exc:
+        _ = list(_iter_textgrid_intervals(str(textgrid_file), 1))
+    assert 'only has 1 tiers' in str(exc.value)
+
+def test_convert_text_to_ascii(tmp_path):
+    text_dir = tmp_path / 'txt'
+    output_dir = tmp_path / 'lab'
+    text_dir.mkdir()
+    output_dir.mkdir()
+    (text_dir / 'trial.txt').write_text("Héllo, wörld! It's", encoding='utf-8')
+    _convert_text_to_ascii('trial.txt', str(text_dir), str(output_dir))
+    assert (output_dir / 'trial.lab').read_bytes() == b"HELLO WORLD IT'S"
@@ -62,9 +62,25 @@ def test_label_change_points_2elem_array():
     arr = np.array([-1, 2])
     locs, labels, prior_labels = get_label_change_points(arr)
     print((locs, labels, prior_labels))
-    assert np.array_equal(locs, np.array(1))
-    assert np.array_equal(labels, np.array(2))
-    assert np.array_equal(prior_labels, np.array(-1))
+    assert np.array_equal(locs, np.array([1]))
+    assert np.array_equal(labels, np.array([2]))
+    assert np.array_equal(prior_labels, np.array([-1]))
+
+def test_label_change_points_constant_array():
+    arr = np.array([3, 3, 3, 3])
+    locs, labels, prior_labels = get_label_change_points(arr)
+    assert locs.shape == (0,)
+    assert labels.shape == (0,)
+    assert prior_labels.shape == (0,)
+
+def test_label_change_points_single_transition_is_1d():
+    arr = np.array([0, 0, 5, 5])
+    locs, labels, prior_labels = get_label_change_points(arr)
+    assert locs.shape == (1,)
+    assert np.array_equal(locs, np.array([2]))
+    assert np.array_equal(labels, np.array([5]))
+    assert np.array_equal(prior_labels, np.array([0]))
+
 
 
 # test segment_around_label_transitions
@@ -157,6 +173,36 @@ def test_single_label_segment_transitions_withlags_multiplelabels(outstruct):
     assert np.array_equal(labels[1], labs2_ex)
     assert np.array_equal(prior_labels, np.array([1,2]))
 
+def test_single_label_segment_transitions_lags_past_trial_end(outstruct):
+    # transitions whose lagged window would run past the end of the trial are dropped
+    segments, labels, prior_labels = segment_around_label_transitions(field=outstruct['resp'], labels=outstruct['labels1'],
+                                                                      prechange_samples=0,
+                                                                      postchange_samples=3,
+                                                                      elec_lag=np.array([0,1]))
+    expected = np.array([[[ 4,  7],
+                          [ 6,  9],
+                          [ 8, 11]],
+                         [[ 2,  5],
+                          [ 4,  7],
+                          [ 6,  9]]])
+    assert np.array_equal(segments, expected)
+    assert np.array_equal(labels, np.array([1,2]))
+    assert np.array_equal(prior_labels, np.array([0,-1]))
+
+def test_single_label_segment_transitions_n_jobs(outstruct):
+    labels = (outstruct['labels1'], outstruct['labels2'])
+    segments, labels_out, prior_labels = segment_around_label_transitions(field=outstruct['resp'], labels=labels,
+                                                                          prechange_samples=1,
+                                                                          postchange_samples=2)
+    segments2, labels_out2, prior_labels2 = segment_around_label_transitions(field=outstruct['resp'], labels=labels,
+                                                                             prechange_samples=1,
+                                                                             postchange_samples=2,
+                                                                             n_jobs=2)
+    assert np.array_equal(segments, segments2)
+    assert np.array_equal(labels_out[0], labels_out2[0])
+    assert np.array_equal(labels_out[1], labels_out2[1])
+    assert np.array_equal(prior_labels, prior_labels2)
+
 def test_electrode_lags_fratio():
     rng = np.random.default_rng(1)
     labs = np.zeros(50,)